@@ -1,17 +1,98 @@
 # app_caliente_ids.py
 # Streamlit — Obtener IDs de partidos (eventId) desde Caliente Futbol
 
+import csv
+import io
 import re
+import threading
+from collections import OrderedDict
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import streamlit as st
 
+# ===================== SESIÓN HTTP =====================
+
+class _RetrySin429(Retry):
+    """
+    Retry que solo reintenta por Retry-After en 503. Por defecto urllib3
+    también lo hace en 413/429 aunque no estén en status_forcelist.
+    """
+    RETRY_AFTER_STATUS_CODES = frozenset([503])
+
+@st.cache_resource
+def get_session():
+    """
+    Sesión compartida: reutiliza conexiones keep-alive entre peticiones.
+    Se cachea como recurso para que el pool sobreviva a los reruns.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=_RetrySin429(
+            total=3,
+            # Los reintentos completos son para 5xx; timeouts no se repiten
+            connect=1,
+            read=0,
+            backoff_factor=0.3,
+            # Sin 429: si el servidor pide bajar el ritmo, se falla al primer intento
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=frozenset({"GET"}),
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# Busca "eventId":123456 o "eventId":"123456" (sobre bytes, sin decodificar)
+_EVENTID_RE = re.compile(rb'"eventId"\s*:\s*"?(\d+)"?')
+
+# Bytes que se arrastran entre chunks para no partir un "eventId" a la mitad
+_TRASLAPE = 64
+
+# Máximo de URLs con validadores ETag/Last-Modified guardados
+_MAX_VALIDADORES = 16
+
 # ===================== FUNCIÓN PRINCIPAL =====================
 
+def _extraer_event_ids(chunks):
+    """
+    Recorre los chunks de bytes del HTML y regresa los eventId únicos
+    (como int) en orden de aparición, sin armar la página completa en memoria.
+    """
+    ids = {}  # dict en lugar de set: quita duplicados y conserva el orden
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        corte = max(0, len(buffer) - _TRASLAPE)
+        for m in _EVENTID_RE.finditer(buffer):
+            if m.end() == len(buffer):
+                # El número puede seguir en el próximo chunk: se vuelve a buscar
+                corte = min(corte, m.start())
+                break
+            ids.setdefault(int(m.group(1)))
+        buffer = buffer[corte:]
+    for m in _EVENTID_RE.findall(buffer):
+        ids.setdefault(int(m))
+    return list(ids)
+
+@st.cache_resource
+def _validadores_http():
+    """
+    Guarda por URL (etag, last_modified, ids) de la última descarga para
+    poder mandar peticiones condicionales. Sobrevive a los reruns y lo
+    comparten todas las sesiones, así que es un LRU acotado con su lock.
+    """
+    return OrderedDict(), threading.Lock()
+
+@st.cache_data(ttl=300, show_spinner=False)
 def get_match_ids_from_html(url: str):
     """
     Descarga el HTML de la página y extrae todos los eventId que encuentre.
-    Regresa una lista de IDs únicos como strings.
+    Regresa una lista de IDs únicos como int, en el orden en que
+    aparecen en la página.
+    El resultado se cachea 5 minutos por URL entre reruns de Streamlit.
     """
     headers = {
         "User-Agent": (
@@ -22,16 +103,51 @@ def get_match_ids_from_html(url: str):
         "Accept-Language": "es-MX,es;q=0.9,en;q=0.8",
     }
 
-    resp = requests.get(url, headers=headers, timeout=30)
-    resp.raise_for_status()
-    html = resp.text
+    validadores, lock = _validadores_http()
+    with lock:
+        previo = validadores.get(url)
+        if previo:
+            validadores.move_to_end(url)
+    if previo:
+        etag, last_modified, _ = previo
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
 
-    # Busca "eventId":123456 o "eventId":"123456"
-    ids = re.findall(r'"eventId"\s*:\s*"?(\d+)"?', html)
+    # (conexión, lectura): con un reintento de conexión, un host caído falla
+    # en ~10s (2 intentos de 5s) sin recortar la descarga
+    with get_session().get(url, headers=headers, timeout=(5, 30), stream=True) as resp:
+        # 304: la página no cambió, reutiliza los IDs de la descarga anterior
+        if resp.status_code == 304 and previo:
+            ids = previo[2]
+        else:
+            resp.raise_for_status()
+            ids = _extraer_event_ids(resp.iter_content(65536))
 
-    # Quita duplicados y ordena
-    unique_ids = sorted(set(ids), key=int)
-    return unique_ids
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+            if etag or last_modified:
+                with lock:
+                    validadores[url] = (etag, last_modified, ids)
+                    validadores.move_to_end(url)
+                    while len(validadores) > _MAX_VALIDADORES:
+                        validadores.popitem(last=False)
+
+    return list(ids)
+
+def ids_to_csv_bytes(ids):
+    """
+    Arma el CSV (columna eventId) directo en bytes con el módulo csv,
+    sin construir un DataFrame.
+    """
+    buffer_csv = io.BytesIO()
+    texto = io.TextIOWrapper(buffer_csv, encoding="utf-8", newline="")
+    writer = csv.writer(texto, lineterminator="\n")
+    writer.writerow(["eventId"])
+    writer.writerows([i] for i in ids)
+    texto.detach()  # vacía el texto pendiente sin cerrar el BytesIO
+    return buffer_csv.getvalue()
 
 # ===================== UI STREAMLIT =====================
 
@@ -42,6 +158,7 @@ st.caption("Extrae los `eventId` desde la página de Futbol.")
 
 default_url = "https://sports.caliente.mx/es_MX/Futbol"
 url = st.text_input("URL de la página de Futbol", value=default_url)
+ordenar = st.checkbox("Ordenar numéricamente")
 
 if st.button("🔍 Obtener IDs de partidos"):
     if not url.strip():
@@ -51,15 +168,19 @@ if st.button("🔍 Obtener IDs de partidos"):
             with st.spinner("Descargando página y extrayendo IDs..."):
                 ids = get_match_ids_from_html(url)
 
+            # Ordenar es local: no forma parte de la llave del cache
+            if ordenar:
+                ids = sorted(ids)
+            ids = [str(i) for i in ids]
+
             if ids:
                 st.success(f"Se encontraron {len(ids)} IDs de partido.")
-                df = pd.DataFrame({"eventId": ids})
-                st.dataframe(df, use_container_width=True)
+                st.dataframe({"eventId": ids}, use_container_width=True)
 
-                csv = df.to_csv(index=False).encode("utf-8")
+                csv_bytes = ids_to_csv_bytes(ids)
                 st.download_button(
                     "⬇️ Descargar IDs en CSV",
-                    data=csv,
+                    data=csv_bytes,
                     file_name="caliente_event_ids.csv",
                     mime="text/csv",
                 )